@@ -0,0 +1,92 @@
+import gzip
+import hashlib
+import json
+import threading
+from collections import defaultdict, deque
+from pathlib import Path
+from typing import Any, Deque, Dict, Literal
+
+
+class CassetteMissError(RuntimeError):
+    """
+    Levantado no modo replay quando uma requisição não existe no cassete
+    (ou quando todas as respostas gravadas para ela já foram servidas).
+    Não deve ser absorvido pelos nós do grafo: o replay tem que falhar alto.
+    """
+
+
+class Cassette:
+    """
+    Grava e reproduz os pares requisição/resposta de call_model.
+
+    O arquivo é um JSONL comprimido com gzip, com uma linha por chamada:
+    {"key": <sha256 da requisição>, "prompt": <início do prompt>, "response": ...}.
+    Chamadas que falharam são gravadas com "error" no lugar de "response" e
+    reproduzidas como o mesmo RuntimeError.
+    No modo "record" cada chamada é anexada ao arquivo assim que termina,
+    e no modo "replay" o cassete inteiro é carregado em memória.
+    """
+
+    def __init__(self, path: Path, mode: Literal["record", "replay"]):
+        self.path = path
+        self.mode = mode
+        self._lock = threading.Lock()
+        self._responses: Dict[str, Deque[Dict[str, str]]] = defaultdict(deque)
+
+        if mode == "replay":
+            if not path.exists():
+                raise FileNotFoundError(f"Cassette not found: {path}")
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._responses[entry["key"]].append(entry)
+        else:
+            # Uma nova gravação sempre começa de um cassete vazio
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(b"")
+
+    @staticmethod
+    def key(prompt_text: str, **params: Any) -> str:
+        """
+        Identifica uma requisição pelo prompt e pelos parâmetros da chamada.
+        """
+        material = json.dumps(
+            {"prompt": prompt_text, **params}, ensure_ascii=False, sort_keys=True
+        )
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def record(self, prompt_text: str, response: str, **params: Any) -> None:
+        self._append(prompt_text, {"response": response}, **params)
+
+    def record_error(self, prompt_text: str, error: str, **params: Any) -> None:
+        self._append(prompt_text, {"error": error}, **params)
+
+    def _append(self, prompt_text: str, outcome: Dict[str, str], **params: Any) -> None:
+        entry = {
+            "key": self.key(prompt_text, **params),
+            "prompt": prompt_text[:80],
+            **outcome,
+        }
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        with self._lock:
+            # Cada append gera um membro gzip novo; o gzip lê todos em sequência
+            with gzip.open(self.path, "at", encoding="utf-8") as f:
+                f.write(line)
+
+    def replay(self, prompt_text: str, **params: Any) -> str:
+        key = self.key(prompt_text, **params)
+        with self._lock:
+            queue = self._responses.get(key)
+            if not queue:
+                preview = " ".join(prompt_text.split())[:80]
+                reason = "exhausted" if queue is not None else "no recorded response"
+                raise CassetteMissError(
+                    f"Cassette {self.path.name}: {reason} for request "
+                    f"{key[:12]} ({preview!r})"
+                )
+            # Requisições repetidas são servidas na ordem em que foram gravadas
+            entry = queue.popleft()
+        if "error" in entry:
+            raise RuntimeError(entry["error"])
+        return entry["response"]
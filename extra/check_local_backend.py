@@ -0,0 +1,121 @@
+"""
+Verificação do OpenAICompatibleBackend contra um servidor local simulado
+(http.server), sem precisar de um servidor de inferência de verdade.
+
+Uso (a partir da raiz do repositório):
+    python3 -m extra.check_local_backend
+"""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List
+
+from extra.llm_backends import OpenAICompatibleBackend
+from pipeline import ClinicalOutput
+
+SAMPLE_OUTPUT = {
+    "analysis": "Análise de teste",
+    "themes": ["luto", "família", "trabalho"],
+    "signifiers": ["mãe", "vazio", "casa"],
+    "hypotheses": ["hipótese 1", "hipótese 2"],
+    "questions": ["pergunta 1", "pergunta 2", "pergunta 3"],
+    "risk_assessment": {"level": "baixo", "signals": []},
+    "clinical_report": {"required": False, "summary": ""},
+}
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """
+    Responde a /v1/chat/completions como um servidor compatível com o OpenAI
+    e guarda cada requisição recebida para ser conferida depois.
+    """
+
+    # HTTP/1.1 para que a conexão seja mantida aberta entre as requisições
+    protocol_version = "HTTP/1.1"
+    requests: List[Dict[str, Any]] = []
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.requests.append(
+            {"path": self.path, "client_port": self.client_address[1], "body": body}
+        )
+        data = json.dumps(
+            {
+                "choices": [{"message": {"content": json.dumps(SAMPLE_OUTPUT)}}],
+                "usage": {"prompt_tokens": 120, "completion_tokens": 80},
+            }
+        ).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def check_schema(node, path="schema"):
+    """
+    Confere que o schema enviado é aceito pelo modo "strict".
+    """
+    if isinstance(node, list):
+        for i, item in enumerate(node):
+            check_schema(item, f"{path}[{i}]")
+        return
+    if not isinstance(node, dict):
+        return
+    assert "$ref" not in node and "$defs" not in node, f"{path}: referência"
+    if "properties" in node:
+        assert node.get("additionalProperties") is False, f"{path}: objeto aberto"
+        assert set(node["required"]) == set(node["properties"]), f"{path}: required"
+        for name, prop in node["properties"].items():
+            check_schema(prop, f"{path}.{name}")
+    for key in ("items", "anyOf"):
+        if key in node:
+            check_schema(node[key], f"{path}.{key}")
+
+
+def main():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}/v1"
+
+    backend = OpenAICompatibleBackend(base_url, "stand-in", ClinicalOutput)
+    try:
+        for temperature in (0.5, 0.75):
+            raw = backend.generate(
+                "ENTRADA", static_prefix="PREFIXO ", temperature=temperature
+            )
+            ClinicalOutput.model_validate_json(raw)
+    finally:
+        backend.close()
+        server.shutdown()
+
+    received = StandInHandler.requests
+    assert len(received) == 2, f"esperava 2 requisições, recebeu {len(received)}"
+    for request, temperature in zip(received, (0.5, 0.75)):
+        body = request["body"]
+        assert request["path"] == "/v1/chat/completions", request["path"]
+        assert body["model"] == "stand-in"
+        assert body["temperature"] == temperature
+        assert body["messages"] == [{"role": "user", "content": "PREFIXO ENTRADA"}]
+        response_format = body["response_format"]
+        assert response_format["type"] == "json_schema"
+        assert response_format["json_schema"]["strict"] is True
+        check_schema(response_format["json_schema"]["schema"])
+
+    # Keep-alive: as duas chamadas usam a mesma conexão TCP
+    ports = {request["client_port"] for request in received}
+    assert len(ports) == 1, f"conexões diferentes: {sorted(ports)}"
+
+    usage = backend.usage()
+    assert usage["model_calls"] == 2
+    assert usage["input_tokens"] == 240 and usage["output_tokens"] == 160
+
+    print("Local backend OK: request, strict schema, keep-alive and usage")
+
+
+if __name__ == "__main__":
+    main()
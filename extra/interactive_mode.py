@@ -73,12 +73,13 @@ def format_console_output(data: Dict[str, Any]):
     print("+" * 80 + "\n")
 
 
-def run_interactive_mode(app, version: str):
+def run_interactive_mode(app, version: str, candidates: int = 1):
     """
     Executa o loop principal do Chatbot.
     Args:
         app: O grafo compilado do LangGraph (StateGraph).
         version: A versão do prompt (v1 ou v2).
+        candidates: Número de candidatos gerados em paralelo por análise.
     """
     print("\n" + "-" * 50)
     print(f"   MODO INTERATIVO - Chatbot Psicanalítico [{version.upper()}]")
@@ -108,6 +109,7 @@ def run_interactive_mode(app, version: str):
                 "raw_response": None,
                 "parsed_output": None,
                 "errors": [],
+                "candidates": candidates,
             }
 
             # Invoca o grafo
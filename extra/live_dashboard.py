@@ -0,0 +1,193 @@
+import html
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from extra.visual_report import render_infographic_file
+
+RISK_LEVELS = ("baixo", "médio", "alto")
+RISK_COLORS = {"baixo": "#55c276", "médio": "#d1cd64", "alto": "#d6384d"}
+
+
+class RunningStats:
+    """
+    Agregados da execução atualizados em O(1) a cada item finalizado:
+    distribuição de risco, sucesso/falha, correções e vazão.
+    Os métodos são protegidos por lock, pois o dashboard lê de outra thread.
+    """
+
+    def __init__(self, total_expected: int = 0):
+        self.total_expected = total_expected
+        self.started_at = time.monotonic()
+        self.risk_counts = {level: 0 for level in RISK_LEVELS}
+        self.ok = 0
+        self.failed = 0
+        self.retries = 0
+        self.busy_seconds = 0.0
+        self.max_item_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def add(
+        self,
+        ok: bool,
+        risk_level: Optional[str] = None,
+        retries: int = 0,
+        elapsed: float = 0.0,
+    ) -> None:
+        with self._lock:
+            if ok:
+                self.ok += 1
+                level = (risk_level or "").lower()
+                if level in self.risk_counts:
+                    self.risk_counts[level] += 1
+            else:
+                self.failed += 1
+            self.retries += retries
+            self.busy_seconds += elapsed
+            self.max_item_seconds = max(self.max_item_seconds, elapsed)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Cópia consistente dos agregados, pronta para ser renderizada.
+        """
+        with self._lock:
+            done = self.ok + self.failed
+            wall = time.monotonic() - self.started_at
+            return {
+                "total": done,
+                "total_expected": self.total_expected,
+                "ok": self.ok,
+                "failed": self.failed,
+                "retries": self.retries,
+                "risk_counts": dict(self.risk_counts),
+                "elapsed_seconds": wall,
+                "items_per_minute": done / wall * 60 if wall > 0 else 0.0,
+                "avg_item_seconds": self.busy_seconds / done if done else 0.0,
+                "busy_seconds": self.busy_seconds,
+                "max_item_seconds": self.max_item_seconds,
+            }
+
+
+def render_svg(snap: Dict[str, Any]) -> str:
+    """
+    Renderiza os agregados como um SVG simples (sem matplotlib).
+    """
+    width, height = 720, 360
+    counts = [snap["risk_counts"][level] for level in RISK_LEVELS]
+    max_count = max(max(counts), 1)
+    bar_area = 220
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" '
+        f'height="{height}" font-family="Helvetica, Arial, sans-serif">',
+        f'<rect width="{width}" height="{height}" fill="#09090f"/>',
+        '<text x="20" y="34" fill="white" font-size="20" font-weight="bold">'
+        f"Pipeline em execução - {snap['total']}/{snap['total_expected']}"
+        " arquivos</text>",
+    ]
+
+    # Barras do nível de risco
+    for i, (level, count) in enumerate(zip(RISK_LEVELS, counts)):
+        bar_h = bar_area * count / max_count
+        x = 40 + i * 110
+        y = 300 - bar_h
+        parts.append(
+            f'<rect x="{x}" y="{y:.1f}" width="80" height="{bar_h:.1f}" '
+            f'fill="{RISK_COLORS[level]}"/>'
+        )
+        parts.append(
+            f'<text x="{x + 40}" y="{y - 6:.1f}" fill="white" font-size="14" '
+            f'text-anchor="middle">{count}</text>'
+        )
+        parts.append(
+            f'<text x="{x + 40}" y="322" fill="white" font-size="13" '
+            f'text-anchor="middle">{level.capitalize()}</text>'
+        )
+
+    # Indicadores numéricos
+    lines = [
+        f"Sucesso: {snap['ok']}",
+        f"Falha: {snap['failed']}",
+        f"Correções: {snap['retries']}",
+        f"Vazão: {snap['items_per_minute']:.1f} itens/min",
+        f"Tempo médio: {snap['avg_item_seconds']:.1f} s/item",
+        f"Decorrido: {snap['elapsed_seconds'] / 60:.1f} min",
+    ]
+    for i, line in enumerate(lines):
+        parts.append(
+            f'<text x="420" y="{100 + i * 30}" fill="white" font-size="16">'
+            f"{html.escape(line)}</text>"
+        )
+
+    parts.append("</svg>")
+    return "\n".join(parts)
+
+
+def render_html(snap: Dict[str, Any], refresh_seconds: float) -> str:
+    """
+    Envolve o SVG em uma página que se recarrega sozinha no navegador.
+    """
+    refresh = max(1, int(refresh_seconds))
+    return (
+        "<!DOCTYPE html>\n<html><head><meta charset='utf-8'>"
+        f"<meta http-equiv='refresh' content='{refresh}'>"
+        "<title>Pipeline - dashboard</title></head>"
+        "<body style='background:#09090f;margin:0'>\n"
+        f"{render_svg(snap)}\n</body></html>\n"
+    )
+
+
+class LiveDashboard:
+    """
+    Re-renderiza o dashboard em uma thread de fundo a cada `interval` segundos,
+    sem bloquear o loop de chamadas ao modelo. O formato de saída é escolhido
+    pela extensão do arquivo: .html e .svg são leves, .png usa o matplotlib.
+    """
+
+    def __init__(self, stats: RunningStats, output_path: Path, interval: float = 10.0):
+        self.stats = stats
+        self.output_path = output_path
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._loop, name="live-dashboard", daemon=True
+        )
+
+    def start(self) -> "LiveDashboard":
+        self.output_path.parent.mkdir(parents=True, exist_ok=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """
+        Interrompe a thread e faz uma última renderização com os dados finais.
+        """
+        self._stop.set()
+        self._thread.join()
+        try:
+            self.render()
+        except Exception as e:
+            # Uma falha no dashboard não pode derrubar os resultados da execução
+            print(f"Error refreshing live dashboard: {e}")
+
+    def render(self) -> None:
+        snap = self.stats.snapshot()
+        suffix = self.output_path.suffix.lower()
+        if suffix == ".png":
+            render_infographic_file(snap, self.output_path, snap["risk_counts"])
+            return
+
+        content = (
+            render_svg(snap) if suffix == ".svg" else render_html(snap, self.interval)
+        )
+        # Escrita atômica para o navegador nunca ler um arquivo pela metade
+        tmp_path = self.output_path.with_name(self.output_path.name + ".tmp")
+        tmp_path.write_text(content, encoding="utf-8")
+        tmp_path.replace(self.output_path)
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.render()
+            except Exception as e:
+                print(f"Error refreshing live dashboard: {e}")
@@ -0,0 +1,247 @@
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Optional, Type
+
+import httpx
+from google.genai import types
+from pydantic import BaseModel
+
+from extra.prompt_cache import PromptCache
+
+
+def strict_json_schema(model: Type[BaseModel]) -> Dict[str, Any]:
+    """
+    Converte o JSON Schema do Pydantic para o formato aceito pelo modo
+    "strict" do response_format: referências ($defs/$ref) expandidas, todo
+    objeto com additionalProperties=false e todas as propriedades
+    obrigatórias, sem os campos "title" gerados automaticamente.
+    """
+    schema = model.model_json_schema()
+    definitions = schema.pop("$defs", {})
+
+    def resolve(node):
+        if isinstance(node, list):
+            return [resolve(item) for item in node]
+        if not isinstance(node, dict):
+            return node
+        if "$ref" in node:
+            return resolve(definitions[node["$ref"].rsplit("/", 1)[-1]])
+
+        node = {key: value for key, value in node.items() if key != "title"}
+        if "properties" in node:
+            node["properties"] = {
+                name: resolve(prop) for name, prop in node["properties"].items()
+            }
+            node["required"] = list(node["properties"])
+            node["additionalProperties"] = False
+        for key in ("items", "anyOf"):
+            if key in node:
+                node[key] = resolve(node[key])
+        return node
+
+    return resolve(schema)
+
+
+class LLMBackend(ABC):
+    """
+    Interface dos backends de modelo usados por call_model.
+    generate() recebe o prompt dividido em prefixo estático + parte variável
+    e devolve o texto (JSON) da resposta.
+    Cada backend acumula o uso (chamadas, latência e tokens) da execução.
+    """
+
+    name = "base"
+
+    def __init__(self, model: str):
+        self.model = model
+        self.calls = 0
+        self.call_seconds = 0.0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self._usage_lock = threading.Lock()
+
+    def track_usage(
+        self, elapsed: float, input_tokens: int = 0, output_tokens: int = 0
+    ) -> None:
+        with self._usage_lock:
+            self.calls += 1
+            self.call_seconds += elapsed
+            self.input_tokens += input_tokens or 0
+            self.output_tokens += output_tokens or 0
+
+    def usage(self) -> Dict[str, Any]:
+        with self._usage_lock:
+            return {
+                "model_calls": self.calls,
+                "call_seconds": self.call_seconds,
+                "input_tokens": self.input_tokens,
+                "output_tokens": self.output_tokens,
+            }
+
+    @abstractmethod
+    def generate(
+        self, prompt_text: str, static_prefix: str = "", temperature: float = 0.5
+    ) -> str:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class GeminiBackend(LLMBackend):
+    """
+    Backend padrão: API oficial do Gemini via google-genai.
+    """
+
+    name = "gemini"
+
+    def __init__(
+        self,
+        client,
+        model: str,
+        response_schema: Type[BaseModel],
+        prompt_cache: Optional[PromptCache] = None,
+    ):
+        super().__init__(model)
+        self.client = client
+        self.response_schema = response_schema
+        self.prompt_cache = prompt_cache
+
+    def generate(
+        self, prompt_text: str, static_prefix: str = "", temperature: float = 0.5
+    ) -> str:
+        if self.client is None:
+            raise ValueError("ERRO: GOOGLE_API_KEY não encontrada no .env")
+
+        # Com o cache de contexto ativo, o prefixo estático fica no cache
+        # e só a parte variável do prompt é enviada
+        cache_name = self.prompt_cache.get(static_prefix) if self.prompt_cache else None
+
+        started = time.perf_counter()
+        try:
+            response = self.client.models.generate_content(
+                model=self.model,
+                contents=prompt_text if cache_name else static_prefix + prompt_text,
+                config=types.GenerateContentConfig(
+                    cached_content=cache_name,
+                    response_mime_type="application/json",
+                    temperature=temperature,
+                    # Passar o schema Pydantic direto aqui melhora a precisão
+                    response_schema=self.response_schema,
+                    # É necessário desativar algumas barreiras de segurança,
+                    # pois os prompts podem conter temas sensíveis
+                    safety_settings=[
+                        types.SafetySetting(
+                            category="HARM_CATEGORY_DANGEROUS_CONTENT",
+                            threshold="BLOCK_NONE",
+                        ),
+                        types.SafetySetting(
+                            category="HARM_CATEGORY_HARASSMENT",
+                            threshold="BLOCK_NONE",
+                        ),
+                        types.SafetySetting(
+                            category="HARM_CATEGORY_HATE_SPEECH",
+                            threshold="BLOCK_NONE",
+                        ),
+                        types.SafetySetting(
+                            category="HARM_CATEGORY_SEXUALLY_EXPLICIT",
+                            threshold="BLOCK_NONE",
+                        ),
+                        types.SafetySetting(
+                            category="HARM_CATEGORY_CIVIC_INTEGRITY",
+                            threshold="BLOCK_NONE",
+                        ),
+                    ],
+                ),
+            )
+        except Exception as e:
+            # Repassa o erro para ser capturado no generation_node
+            raise RuntimeError(f"Error in the Google API: {str(e)}")
+
+        usage = getattr(response, "usage_metadata", None)
+        self.track_usage(
+            time.perf_counter() - started,
+            # Tokens servidos pelo cache também contam como entrada
+            getattr(usage, "prompt_token_count", 0),
+            getattr(usage, "candidates_token_count", 0),
+        )
+        return response.text
+
+    def close(self) -> None:
+        if self.prompt_cache is not None:
+            self.prompt_cache.close()
+
+
+class OpenAICompatibleBackend(LLMBackend):
+    """
+    Backend para servidores de inferência locais que expõem a API de chat
+    do OpenAI (vLLM, llama.cpp server, Ollama, LM Studio...).
+
+    A saída é restrita pelo JSON Schema derivado do modelo Pydantic, e um
+    único httpx.Client mantém o pool de conexões keep-alive entre chamadas
+    (inclusive entre os candidatos concorrentes da geração especulativa).
+    O prompt é enviado sempre na mesma ordem (prefixo estático primeiro),
+    o que permite ao servidor reaproveitar o cache de prefixo, se houver.
+    """
+
+    name = "openai"
+
+    def __init__(
+        self,
+        base_url: str,
+        model: str,
+        response_schema: Type[BaseModel],
+        api_key: Optional[str] = None,
+        timeout: float = 120.0,
+        max_connections: int = 16,
+    ):
+        super().__init__(model)
+        headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+        self.response_format: Dict[str, Any] = {
+            "type": "json_schema",
+            "json_schema": {
+                "name": response_schema.__name__,
+                "schema": strict_json_schema(response_schema),
+                "strict": True,
+            },
+        }
+        self._client = httpx.Client(
+            base_url=base_url.rstrip("/") + "/",
+            headers=headers,
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+            ),
+        )
+
+    def generate(
+        self, prompt_text: str, static_prefix: str = "", temperature: float = 0.5
+    ) -> str:
+        body = {
+            "model": self.model,
+            "messages": [{"role": "user", "content": static_prefix + prompt_text}],
+            "temperature": temperature,
+            "response_format": self.response_format,
+        }
+        started = time.perf_counter()
+        try:
+            response = self._client.post("chat/completions", json=body)
+            response.raise_for_status()
+            data = response.json()
+            content = data["choices"][0]["message"]["content"]
+        except Exception as e:
+            # Repassa o erro para ser capturado no generation_node
+            raise RuntimeError(f"Error in the local LLM backend: {str(e)}")
+
+        usage = data.get("usage") or {}
+        self.track_usage(
+            time.perf_counter() - started,
+            usage.get("prompt_tokens", 0),
+            usage.get("completion_tokens", 0),
+        )
+        return content
+
+    def close(self) -> None:
+        self._client.close()
@@ -0,0 +1,210 @@
+import cProfile
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List
+
+
+class StageProfiler:
+    """
+    Perfil de CPU e memória por etapa da pipeline (--profile).
+
+    Para cada etapa são coletados:
+    - cProfile (determinístico), salvo em <etapa>.prof para pstats/snakeviz;
+    - amostras periódicas da pilha de chamadas, salvas em <etapa>.folded no
+      formato "collapsed stacks" aceito por flamegraph.pl, speedscope e inferno;
+    - memória alocada (líquida) e pico do tracemalloc a cada chamada, e as
+      linhas com mais alocações na primeira chamada de cada etapa, resumidos
+      no relatório allocations.txt.
+
+    Snapshots do tracemalloc são caros (dezenas de ms cada), por isso só a
+    primeira chamada de cada etapa é comparada linha a linha; as demais
+    usam apenas os contadores de get_traced_memory().
+    """
+
+    def __init__(
+        self, output_dir: Path, sample_interval: float = 0.005, top_n: int = 20
+    ):
+        self.output_dir = output_dir
+        self.sample_interval = sample_interval
+        self.top_n = top_n
+
+        self._profiles: Dict[str, cProfile.Profile] = {}
+        self._worker_profiles: Dict[str, List[cProfile.Profile]] = defaultdict(list)
+        self._samples: Dict[str, Counter] = defaultdict(Counter)
+        self._allocations: Dict[str, Counter] = defaultdict(Counter)
+        self._peaks: Dict[str, int] = defaultdict(int)
+        self._net: Dict[str, int] = defaultdict(int)
+        self._times: Dict[str, float] = defaultdict(float)
+        self._calls: Dict[str, int] = defaultdict(int)
+
+        # thread -> etapa ativa (lido pela thread de amostragem)
+        self._active: Dict[int, str] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler = threading.Thread(
+            target=self._sample_loop, name="stage-sampler", daemon=True
+        )
+
+    def start(self) -> "StageProfiler":
+        # Só o frame de origem é usado no relatório
+        tracemalloc.start(1)
+        self._sampler.start()
+        return self
+
+    @contextmanager
+    def stage(self, name: str):
+        """
+        Mede o bloco como a etapa `name`. Etapas aninhadas na mesma thread
+        são contabilizadas apenas na etapa mais externa.
+        """
+        thread_id = threading.get_ident()
+        if thread_id in self._active:
+            yield
+            return
+
+        before = self._snapshot() if name not in self._profiles else None
+        current_before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        profile = self._profiles.setdefault(name, cProfile.Profile())
+        self._active[thread_id] = name
+        started = time.perf_counter()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            elapsed = time.perf_counter() - started
+            del self._active[thread_id]
+
+            current_after, peak = tracemalloc.get_traced_memory()
+            after = self._snapshot() if before is not None else None
+            with self._lock:
+                self._times[name] += elapsed
+                self._calls[name] += 1
+                self._peaks[name] = max(self._peaks[name], peak)
+                self._net[name] += current_after - current_before
+                if after is not None:
+                    for stat in after.compare_to(before, "lineno"):
+                        if stat.size_diff:
+                            frame = stat.traceback[0]
+                            self._allocations[name][
+                                f"{frame.filename}:{frame.lineno}"
+                            ] += stat.size_diff
+
+    @contextmanager
+    def attach(self, name: str):
+        """
+        Inclui a thread atual (por exemplo, um worker de ThreadPoolExecutor)
+        na etapa `name`, aberta por outra thread. A pilha da thread passa a
+        ser amostrada e o cProfile dela é somado ao da etapa no final; tempo,
+        chamadas e memória continuam contabilizados pela thread da etapa.
+        """
+        thread_id = threading.get_ident()
+        if thread_id in self._active:
+            yield
+            return
+
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # A partir do Python 3.12 só um cProfile fica ativo por vez (e ele
+            # já observa todas as threads): a thread fica só com a amostragem
+            profile = None
+        self._active[thread_id] = name
+        try:
+            yield
+        finally:
+            del self._active[thread_id]
+            if profile is not None:
+                profile.disable()
+                with self._lock:
+                    self._worker_profiles[name].append(profile)
+
+    @staticmethod
+    def _snapshot() -> tracemalloc.Snapshot:
+        # Ignora as alocações do próprio tracemalloc e do profiler
+        return tracemalloc.take_snapshot().filter_traces(
+            [
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, __file__),
+            ]
+        )
+
+    def _sample_loop(self) -> None:
+        while not self._stop.wait(self.sample_interval):
+            frames = sys._current_frames()
+            for thread_id, name in list(self._active.items()):
+                frame = frames.get(thread_id)
+                if frame is None:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(
+                        f"{code.co_name} ({Path(code.co_filename).name}:"
+                        f"{code.co_firstlineno})"
+                    )
+                    frame = frame.f_back
+                with self._lock:
+                    self._samples[name][";".join(reversed(stack))] += 1
+
+    def finish(self) -> List[Path]:
+        """
+        Encerra a coleta e grava os arquivos de cada etapa e o relatório final.
+        """
+        self._stop.set()
+        self._sampler.join()
+        tracemalloc.stop()
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+
+        written = []
+        for name, profile in self._profiles.items():
+            prof_path = self.output_dir / f"{name}.prof"
+            stats = pstats.Stats(profile)
+            for worker_profile in self._worker_profiles[name]:
+                stats.add(worker_profile)
+            stats.dump_stats(str(prof_path))
+            written.append(prof_path)
+
+            folded_path = self.output_dir / f"{name}.folded"
+            folded_path.write_text(
+                "".join(
+                    f"{stack} {count}\n"
+                    for stack, count in self._samples[name].most_common()
+                ),
+                encoding="utf-8",
+            )
+            written.append(folded_path)
+
+        report_path = self.output_dir / "allocations.txt"
+        report_path.write_text(self.report(), encoding="utf-8")
+        written.append(report_path)
+        return written
+
+    def report(self) -> str:
+        """
+        Resumo por etapa: tempo total, chamadas, pico de memória e as linhas
+        de código com maior alocação líquida.
+        """
+        lines = ["RELATÓRIO DE PERFIL POR ETAPA", ""]
+        for name in sorted(self._times, key=self._times.get, reverse=True):
+            calls = self._calls[name]
+            lines.append(
+                f"[{name}] {self._times[name]:.3f}s em {calls} chamada(s)"
+                f" | média {self._times[name] / calls * 1000:.1f} ms"
+                f" | líquido {self._net[name] / 1024:.1f} KiB"
+                f" | pico {self._peaks[name] / 1024:.1f} KiB"
+            )
+            for location, size in self._allocations[name].most_common(self.top_n):
+                if size <= 0:
+                    break
+                lines.append(f"    {size / 1024:>10.1f} KiB  {location}")
+            lines.append("")
+        return "\n".join(lines)
@@ -0,0 +1,91 @@
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from google.genai import types
+
+
+class PromptCache:
+    """
+    Registra o prefixo estático do prompt no cache explícito de contexto do
+    Gemini, para que cada chamada envie apenas o texto do paciente.
+
+    O cache é criado na primeira chamada com um TTL e renovado automaticamente
+    quando está perto de expirar. Se o prefixo não puder ser cacheado (ex:
+    abaixo do mínimo de tokens do modelo), get() devolve None e quem chama
+    envia o prompt completo, como antes.
+    """
+
+    def __init__(
+        self,
+        client,
+        model: str,
+        ttl_seconds: int = 3600,
+        refresh_margin: int = 60,
+    ):
+        self.client = client
+        self.model = model
+        self.ttl_seconds = ttl_seconds
+        self.refresh_margin = min(refresh_margin, ttl_seconds // 2)
+        self._lock = threading.Lock()
+        # prefixo -> (nome do cache, instante de expiração local)
+        self._entries: Dict[str, Tuple[str, float]] = {}
+        self._uncacheable = set()
+
+    def get(self, prefix: str) -> Optional[str]:
+        """
+        Devolve o nome do cache que contém o prefixo, criando ou renovando
+        o cache quando necessário.
+        """
+        if not prefix or prefix in self._uncacheable:
+            return None
+
+        with self._lock:
+            now = time.monotonic()
+            entry = self._entries.get(prefix)
+            if entry and now < entry[1] - self.refresh_margin:
+                return entry[0]
+
+            if entry:
+                try:
+                    self.client.caches.update(
+                        name=entry[0],
+                        config=types.UpdateCachedContentConfig(
+                            ttl=f"{self.ttl_seconds}s"
+                        ),
+                    )
+                    self._entries[prefix] = (entry[0], now + self.ttl_seconds)
+                    return entry[0]
+                except Exception as e:
+                    # O cache pode ter expirado no servidor: cria outro
+                    print(f"Warning: could not refresh prompt cache: {e}")
+
+            try:
+                cache = self.client.caches.create(
+                    model=self.model,
+                    config=types.CreateCachedContentConfig(
+                        contents=[prefix],
+                        ttl=f"{self.ttl_seconds}s",
+                        display_name="clinical-prompt-prefix",
+                    ),
+                )
+            except Exception as e:
+                print(f"Warning: prompt prefix not cached, sending full prompt: {e}")
+                self._entries.pop(prefix, None)
+                self._uncacheable.add(prefix)
+                return None
+
+            self._entries[prefix] = (cache.name, now + self.ttl_seconds)
+            return cache.name
+
+    def close(self) -> None:
+        """
+        Apaga os caches criados nesta execução em vez de esperar o TTL.
+        """
+        with self._lock:
+            for name, _ in self._entries.values():
+                try:
+                    self.client.caches.delete(name=name)
+                except Exception:
+                    pass
+            self._entries.clear()
@@ -1,8 +1,13 @@
+import math
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, List, Tuple
 
 from fpdf import FPDF
 
+# Alturas (mm) usadas no sumário: título + espaçamento e cada entrada
+TOC_TITLE_HEIGHT = 14
+TOC_LINE_HEIGHT = 7
+
 
 class ClinicalPDF(FPDF):
     def header(self):
@@ -24,15 +29,49 @@ def check_space(pdf, height_needed):
         pdf.add_page()
 
 
-def create_clinical_pdf(data: Dict[str, Any], original_filename: str, output_dir: Path):
+def new_clinical_pdf() -> ClinicalPDF:
     """
-    Gera um PDF formatado com os dados da análise clínica.
+    Cria um documento com a configuração de página padrão dos relatórios.
     """
     pdf = ClinicalPDF()
     pdf.set_left_margin(15)
     pdf.set_right_margin(15)
     pdf.set_auto_page_break(auto=True, margin=15)
-    pdf.add_page()
+    return pdf
+
+
+def create_clinical_pdf(data: Dict[str, Any], original_filename: str, output_dir: Path):
+    """
+    Gera um PDF formatado com os dados da análise clínica.
+    """
+    pdf = new_clinical_pdf()
+    write_clinical_report(pdf, data, original_filename)
+
+    # SALVAMENTO
+    # Garante que o diretório existe
+    output_dir.mkdir(parents=True, exist_ok=True)
+    safe_name = original_filename.rsplit(".", 1)[0] + "_report.pdf"
+    file_path = output_dir / safe_name
+
+    pdf.output(str(file_path))
+    return file_path
+
+
+def write_clinical_report(
+    pdf: ClinicalPDF,
+    data: Dict[str, Any],
+    original_filename: str,
+    new_page: bool = True,
+    bookmark: bool = False,
+):
+    """
+    Escreve o relatório de uma análise a partir de uma nova página do documento.
+    Com bookmark=True, registra a análise no sumário e nos marcadores do PDF.
+    """
+    if new_page:
+        pdf.add_page()
+    if bookmark:
+        pdf.start_section(original_filename)
 
     # TÍTULO E METADADOS
     pdf.set_font("Helvetica", "B", 16)
@@ -159,11 +198,121 @@ def create_clinical_pdf(data: Dict[str, Any], original_filename: str, output_dir
         summary_text = report_data.get("summary", "Sem resumo detalhado fornecido.")
         pdf.multi_cell(0, 7, summary_text)
 
-    # SALVAMENTO
-    # Garante que o diretório existe
-    output_dir.mkdir(parents=True, exist_ok=True)
-    safe_name = original_filename.rsplit(".", 1)[0] + "_report.pdf"
-    file_path = output_dir / safe_name
 
-    pdf.output(str(file_path))
-    return file_path
+def latin1_safe(text: str) -> str:
+    """
+    Substitui caracteres que as fontes padrão (Helvetica) não conseguem desenhar.
+    """
+    return text.encode("latin-1", errors="replace").decode("latin-1")
+
+
+def write_report_error(pdf: ClinicalPDF, original_filename: str, error: Exception):
+    """
+    Registra no documento que o relatório de um paciente não pôde ser gerado,
+    para que os demais relatórios do volume não sejam perdidos.
+    """
+    check_space(pdf, 30)
+    pdf.ln(5)
+    pdf.set_font("Helvetica", "B", 12)
+    pdf.set_text_color(214, 56, 77)
+    pdf.multi_cell(
+        0, 8, latin1_safe(f"Erro ao gerar o relatório de {original_filename}"), ln=True
+    )
+    pdf.set_font("Helvetica", "", 10)
+    pdf.set_text_color(0, 0, 0)
+    pdf.multi_cell(
+        0,
+        7,
+        latin1_safe(f"{error}. Consulte a análise completa no results.json."),
+    )
+
+
+def render_toc(pdf: ClinicalPDF, outline):
+    """
+    Desenha o sumário com links para o relatório de cada paciente.
+    """
+    pdf.set_font("Helvetica", "B", 16)
+    pdf.set_text_color(0, 0, 0)
+    pdf.cell(0, 10, "Sumário", ln=True)
+    pdf.ln(TOC_TITLE_HEIGHT - 10)
+
+    pdf.set_font("Helvetica", "", 11)
+    for section in outline:
+        link = pdf.add_link(page=section.page_number)
+        pdf.cell(pdf.epw - 20, TOC_LINE_HEIGHT, latin1_safe(section.name), link=link)
+        pdf.cell(
+            20,
+            TOC_LINE_HEIGHT,
+            str(section.page_number),
+            align="R",
+            ln=True,
+            link=link,
+        )
+
+    # O fpdf2 exige que o sumário ocupe exatamente as páginas reservadas
+    placeholder = pdf.toc_placeholder
+    while pdf.page < placeholder.start_page + placeholder.pages - 1:
+        pdf.add_page()
+
+
+def toc_pages_needed(pdf: ClinicalPDF, entries: int) -> int:
+    """
+    Quantidade de páginas do sumário, calculada a partir da altura útil da
+    página (do fim do cabeçalho até a margem de quebra de página).
+    Deve ser chamada logo após add_page(), com o cursor no topo do conteúdo.
+    """
+    usable = pdf.page_break_trigger - pdf.get_y()
+    first_page = int((usable - TOC_TITLE_HEIGHT) // TOC_LINE_HEIGHT)
+    per_page = int(usable // TOC_LINE_HEIGHT)
+    return 1 + math.ceil(max(0, entries - first_page) / per_page)
+
+
+def create_bulk_pdf(
+    entries: List[Tuple[str, Dict[str, Any]]],
+    output_dir: Path,
+    volume_size: int = 500,
+    base_name: str = "clinical_reports",
+) -> List[Path]:
+    """
+    Gera relatórios consolidados: todas as análises em poucos PDFs, cada um
+    com sumário e um marcador (bookmark) por paciente.
+    As fontes e a configuração de página são criadas uma vez por volume, e
+    cada volume é gravado em disco e descartado antes do próximo começar.
+    Um relatório que falha é substituído por um aviso de erro e um volume que
+    falha não impede a geração dos seguintes.
+    """
+    if volume_size <= 0:
+        raise ValueError("volume_size deve ser maior que zero")
+    output_dir.mkdir(parents=True, exist_ok=True)
+    paths = []
+    volumes = math.ceil(len(entries) / volume_size)
+
+    for v in range(volumes):
+        chunk = entries[v * volume_size : (v + 1) * volume_size]
+
+        suffix = f"_{v + 1:03d}" if volumes > 1 else ""
+        file_path = output_dir / f"{base_name}{suffix}.pdf"
+
+        try:
+            pdf = new_clinical_pdf()
+            pdf.add_page()
+            # Reserva as páginas do sumário, preenchidas ao final do documento.
+            # O placeholder já abre uma página nova para o primeiro relatório.
+            toc_pages = toc_pages_needed(pdf, len(chunk))
+            pdf.insert_toc_placeholder(render_toc, pages=toc_pages)
+
+            for i, (original_filename, data) in enumerate(chunk):
+                try:
+                    write_clinical_report(
+                        pdf, data, original_filename, new_page=i > 0, bookmark=True
+                    )
+                except Exception as e:
+                    print(f"Error rendering report for {original_filename}: {e}")
+                    write_report_error(pdf, original_filename, e)
+
+            pdf.output(str(file_path))
+            paths.append(file_path)
+        except Exception as e:
+            print(f"Error creating consolidated PDF {file_path.name}: {e}")
+
+    return paths
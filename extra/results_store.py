@@ -0,0 +1,421 @@
+import hashlib
+import json
+import sqlite3
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Tipos de termo indexados no índice invertido e o campo de origem de cada um
+TERM_KINDS = ("theme", "signifier", "signal")
+
+# Agregações aceitas pelo subcomando "query" (--count-by)
+GROUP_BY_COLUMNS = {
+    "risk": "a.risk_level",
+    "prompt": "r.prompt_version",
+    "run": "r.run_id",
+    "day": "substr(r.created_at, 1, 10)",
+    "ok": "a.ok",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    run_id TEXT NOT NULL UNIQUE,
+    created_at TEXT NOT NULL,
+    prompt_version TEXT,
+    total INTEGER,
+    ok INTEGER,
+    failed INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_runs_created_at ON runs (created_at);
+
+CREATE TABLE IF NOT EXISTS analyses (
+    id INTEGER PRIMARY KEY,
+    run INTEGER NOT NULL REFERENCES runs (id),
+    file TEXT NOT NULL,
+    ok INTEGER NOT NULL,
+    risk_level TEXT,
+    report_required INTEGER,
+    errors TEXT,
+    output TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_analyses_run ON analyses (run);
+CREATE INDEX IF NOT EXISTS idx_analyses_risk ON analyses (risk_level, run);
+CREATE INDEX IF NOT EXISTS idx_analyses_file ON analyses (file);
+
+-- Índice invertido: dicionário de termos + listas de postings
+CREATE TABLE IF NOT EXISTS terms (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    term TEXT NOT NULL,
+    UNIQUE (kind, term)
+);
+CREATE TABLE IF NOT EXISTS postings (
+    term INTEGER NOT NULL REFERENCES terms (id),
+    analysis INTEGER NOT NULL REFERENCES analyses (id),
+    PRIMARY KEY (term, analysis)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_postings_analysis ON postings (analysis);
+
+-- Busca textual livre sobre a análise discursiva
+CREATE VIRTUAL TABLE IF NOT EXISTS analyses_fts USING fts5 (
+    analysis, summary, content=''
+);
+"""
+
+
+def normalize_term(term: str) -> str:
+    """
+    Normaliza um termo para o índice invertido (sem espaços extras, minúsculo).
+    """
+    return " ".join(term.split()).casefold()
+
+
+def connect(db_path: Path) -> sqlite3.Connection:
+    """
+    Abre (e cria, se necessário) o banco de resultados.
+    """
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(db_path))
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def _term_ids(
+    conn: sqlite3.Connection, cache: Dict[Tuple[str, str], int], kind: str, terms
+) -> List[int]:
+    ids = []
+    for raw in terms:
+        term = normalize_term(raw)
+        if not term:
+            continue
+        key = (kind, term)
+        if key not in cache:
+            conn.execute("INSERT OR IGNORE INTO terms (kind, term) VALUES (?, ?)", key)
+            cache[key] = conn.execute(
+                "SELECT id FROM terms WHERE kind = ? AND term = ?", key
+            ).fetchone()[0]
+        ids.append(cache[key])
+    return ids
+
+
+def ingest_payload(
+    conn: sqlite3.Connection,
+    payload: Dict[str, Any],
+    run_id: Optional[str] = None,
+    created_at: Optional[str] = None,
+) -> str:
+    """
+    Insere um payload completo (o mesmo formato do results.json) no banco,
+    preenchendo o índice invertido de temas, significantes e sinais de risco.
+    Retorna o run_id registrado. Reingerir o mesmo run_id não duplica dados.
+
+    Payloads antigos não têm run_id/created_at: o run_id é derivado do
+    conteúdo (ou informado por quem chama) para que a reingestão seja idempotente.
+    """
+    run_id = payload.get("run_id") or run_id
+    if not run_id:
+        content = json.dumps(payload, ensure_ascii=False, sort_keys=True)
+        run_id = hashlib.sha256(content.encode("utf-8")).hexdigest()[:32]
+    created_at = (
+        payload.get("created_at")
+        or created_at
+        or datetime.now(timezone.utc).isoformat(timespec="seconds")
+    )
+
+    with conn:
+        exists = conn.execute(
+            "SELECT 1 FROM runs WHERE run_id = ?", (run_id,)
+        ).fetchone()
+        if exists:
+            return run_id
+
+        cur = conn.execute(
+            "INSERT INTO runs (run_id, created_at, prompt_version, total, ok, failed)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                run_id,
+                created_at,
+                payload.get("prompt_version"),
+                payload.get("total", 0),
+                payload.get("ok", 0),
+                payload.get("failed", 0),
+            ),
+        )
+        run_pk = cur.lastrowid
+        term_cache: Dict[Tuple[str, str], int] = {}
+        postings: List[Tuple[int, int]] = []
+        fts_rows: List[Tuple[int, str, str]] = []
+
+        for r in payload.get("results", []):
+            output = r.get("output") or {}
+            risk = output.get("risk_assessment") or {}
+            report = output.get("clinical_report") or {}
+            cur = conn.execute(
+                "INSERT INTO analyses"
+                " (run, file, ok, risk_level, report_required, errors, output)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    run_pk,
+                    r.get("file", ""),
+                    int(bool(r.get("ok"))),
+                    (risk.get("level") or "").lower() or None,
+                    int(bool(report.get("required"))) if output else None,
+                    json.dumps(r.get("errors") or [], ensure_ascii=False),
+                    json.dumps(output, ensure_ascii=False) if output else None,
+                ),
+            )
+            analysis_pk = cur.lastrowid
+            if not output:
+                continue
+
+            sources = {
+                "theme": output.get("themes") or [],
+                "signifier": output.get("signifiers") or [],
+                "signal": risk.get("signals") or [],
+            }
+            for kind in TERM_KINDS:
+                for term_id in set(_term_ids(conn, term_cache, kind, sources[kind])):
+                    postings.append((term_id, analysis_pk))
+            fts_rows.append(
+                (analysis_pk, output.get("analysis", ""), report.get("summary", ""))
+            )
+
+        conn.executemany(
+            "INSERT OR IGNORE INTO postings (term, analysis) VALUES (?, ?)", postings
+        )
+        conn.executemany(
+            "INSERT INTO analyses_fts (rowid, analysis, summary) VALUES (?, ?, ?)",
+            fts_rows,
+        )
+
+    return run_id
+
+
+def ingest_file(conn: sqlite3.Connection, json_path: Path) -> str:
+    """
+    Lê um results.json salvo anteriormente e o insere no banco.
+    Para arquivos sem run_id/created_at, o run_id é o hash do conteúdo do
+    arquivo e a data da execução é a data de modificação do arquivo.
+    """
+    raw = json_path.read_bytes()
+    payload = json.loads(raw.decode("utf-8"))
+    mtime = datetime.fromtimestamp(json_path.stat().st_mtime, timezone.utc)
+    return ingest_payload(
+        conn,
+        payload,
+        run_id=hashlib.sha256(raw).hexdigest()[:32],
+        created_at=mtime.isoformat(timespec="seconds"),
+    )
+
+
+def _build_filters(
+    risk: Optional[Sequence[str]] = None,
+    themes: Iterable[str] = (),
+    signifiers: Iterable[str] = (),
+    signals: Iterable[str] = (),
+    text: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    prompt_version: Optional[str] = None,
+    only_ok: bool = False,
+) -> Tuple[str, List[Any]]:
+    clauses: List[str] = []
+    params: List[Any] = []
+
+    if risk:
+        clauses.append(f"a.risk_level IN ({', '.join('?' * len(risk))})")
+        params.extend(level.lower() for level in risk)
+    if since:
+        clauses.append("r.created_at >= ?")
+        params.append(since)
+    if until:
+        clauses.append("r.created_at < ?")
+        params.append(until)
+    if prompt_version:
+        clauses.append("r.prompt_version = ?")
+        params.append(prompt_version)
+    if only_ok:
+        clauses.append("a.ok = 1")
+
+    # Cada termo exigido vira uma interseção com a sua lista de postings
+    for kind, values in (
+        ("theme", themes),
+        ("signifier", signifiers),
+        ("signal", signals),
+    ):
+        for value in values:
+            clauses.append(
+                "a.id IN (SELECT p.analysis FROM postings p"
+                " JOIN terms t ON t.id = p.term WHERE t.kind = ? AND t.term = ?)"
+            )
+            params.extend([kind, normalize_term(value)])
+
+    if text:
+        clauses.append(
+            "a.id IN (SELECT rowid FROM analyses_fts WHERE analyses_fts MATCH ?)"
+        )
+        params.append(text)
+
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    return where, params
+
+
+def query_analyses(
+    conn: sqlite3.Connection, limit: int = 50, **filters
+) -> List[Dict[str, Any]]:
+    """
+    Retorna as análises que satisfazem todos os filtros, das mais recentes
+    para as mais antigas.
+    """
+    where, params = _build_filters(**filters)
+    rows = conn.execute(
+        "SELECT r.run_id, r.created_at, r.prompt_version, a.file, a.ok,"
+        " a.risk_level, a.output"
+        " FROM analyses a JOIN runs r ON r.id = a.run"
+        f" {where} ORDER BY a.run DESC, a.id LIMIT ?",
+        [*params, limit],
+    ).fetchall()
+
+    return [
+        {
+            "run_id": run_id,
+            "created_at": created_at,
+            "prompt_version": prompt_version,
+            "file": file,
+            "ok": bool(ok),
+            "risk_level": risk_level,
+            "output": json.loads(output) if output else None,
+        }
+        for run_id, created_at, prompt_version, file, ok, risk_level, output in rows
+    ]
+
+
+def aggregate_analyses(
+    conn: sqlite3.Connection, group_by: str, limit: int = 50, **filters
+) -> List[Tuple[Any, int]]:
+    """
+    Conta as análises filtradas agrupando por uma coluna (risco, run, dia...)
+    ou por um tipo de termo do índice invertido (theme, signifier, signal).
+    """
+    where, params = _build_filters(**filters)
+
+    if group_by in TERM_KINDS:
+        # A contagem por termo percorre só o índice invertido
+        term_clause = "t.kind = ?"
+        where = f"{where} AND {term_clause}" if where else f"WHERE {term_clause}"
+        sql = (
+            "SELECT t.term, COUNT(*) AS n FROM postings p"
+            " JOIN terms t ON t.id = p.term"
+            " JOIN analyses a ON a.id = p.analysis"
+            " JOIN runs r ON r.id = a.run"
+            f" {where} GROUP BY t.term ORDER BY n DESC, t.term LIMIT ?"
+        )
+        params = [*params, group_by, limit]
+    elif group_by in GROUP_BY_COLUMNS:
+        column = GROUP_BY_COLUMNS[group_by]
+        sql = (
+            f"SELECT {column} AS k, COUNT(*) AS n"
+            " FROM analyses a JOIN runs r ON r.id = a.run"
+            f" {where} GROUP BY k ORDER BY n DESC LIMIT ?"
+        )
+        params = [*params, limit]
+    else:
+        raise ValueError(f"Agregação desconhecida: {group_by}")
+
+    return conn.execute(sql, params).fetchall()
+
+
+def add_query_arguments(parser) -> None:
+    """
+    Registra os argumentos do subcomando "query" em um parser do argparse.
+    """
+    parser.add_argument(
+        "--risk",
+        action="append",
+        choices=["baixo", "médio", "alto"],
+        help="Filtra pelo nível de risco (pode repetir)",
+    )
+    parser.add_argument(
+        "--theme", action="append", default=[], help="Exige o tema (pode repetir)"
+    )
+    parser.add_argument(
+        "--signifier",
+        action="append",
+        default=[],
+        help="Exige o significante (pode repetir)",
+    )
+    parser.add_argument(
+        "--signal",
+        action="append",
+        default=[],
+        help="Exige o sinal de risco (pode repetir)",
+    )
+    parser.add_argument("--text", help="Busca textual (FTS5) na análise e no laudo")
+    parser.add_argument("--since", help="Data/hora ISO mínima da execução")
+    parser.add_argument("--until", help="Data/hora ISO máxima (exclusiva)")
+    parser.add_argument("--prompt", help="Filtra pela versão do prompt (ex: v2)")
+    parser.add_argument(
+        "--ok", action="store_true", help="Considera apenas análises válidas"
+    )
+    parser.add_argument(
+        "--count-by",
+        choices=sorted([*GROUP_BY_COLUMNS, *TERM_KINDS]),
+        help="Agrega em vez de listar (contagem por grupo)",
+    )
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument(
+        "--json", action="store_true", help="Imprime o resultado em JSON"
+    )
+
+
+def run_query(args, db_path: Path) -> None:
+    """
+    Executa o subcomando "query" e imprime o resultado no terminal.
+    """
+    if not db_path.exists():
+        print(f"Results store not found: {db_path}")
+        return
+
+    filters = {
+        "risk": args.risk,
+        "themes": args.theme,
+        "signifiers": args.signifier,
+        "signals": args.signal,
+        "text": args.text,
+        "since": args.since,
+        "until": args.until,
+        "prompt_version": args.prompt,
+        "only_ok": args.ok,
+    }
+
+    conn = connect(db_path)
+    try:
+        if args.count_by:
+            rows = aggregate_analyses(conn, args.count_by, limit=args.limit, **filters)
+            if args.json:
+                print(json.dumps(rows, ensure_ascii=False, indent=2))
+                return
+            for key, count in rows:
+                print(f"{count:>8}  {key}")
+        else:
+            rows = query_analyses(conn, limit=args.limit, **filters)
+            if args.json:
+                print(json.dumps(rows, ensure_ascii=False, indent=2))
+                return
+            for row in rows:
+                level = (row["risk_level"] or "-").upper()
+                status = "ok" if row["ok"] else "falha"
+                print(
+                    f"{row['created_at']}  {row['run_id'][:8]}  {level:<6}"
+                    f"  {status:<5}  {row['file']}"
+                )
+            print(f"\n{len(rows)} resultado(s).")
+    except sqlite3.OperationalError as e:
+        # Ex: sintaxe inválida na busca textual (--text "mãe AND")
+        print(f"Invalid query: {e}")
+    finally:
+        conn.close()
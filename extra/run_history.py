@@ -0,0 +1,261 @@
+import json
+import sqlite3
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# Colunas agregadas por execução (todas numéricas, somáveis nos rollups)
+SUM_COLUMNS = (
+    "total",
+    "ok",
+    "failed",
+    "retries",
+    "risk_baixo",
+    "risk_medio",
+    "risk_alto",
+    "wall_seconds",
+    "busy_seconds",
+    "model_calls",
+    "call_seconds",
+    "input_tokens",
+    "output_tokens",
+)
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    run_id TEXT NOT NULL UNIQUE,
+    created_at TEXT NOT NULL,
+    prompt_version TEXT NOT NULL,
+    backend TEXT NOT NULL,
+    model TEXT NOT NULL,
+    max_item_seconds REAL NOT NULL DEFAULT 0,
+    {", ".join(f"{c} REAL NOT NULL DEFAULT 0" for c in SUM_COLUMNS)}
+);
+CREATE INDEX IF NOT EXISTS idx_runs_group ON runs (prompt_version, model, id);
+
+-- O registro é append-only: execuções não podem ser alteradas nem removidas
+CREATE TRIGGER IF NOT EXISTS runs_no_update BEFORE UPDATE ON runs
+BEGIN SELECT RAISE(ABORT, 'run history is append-only'); END;
+CREATE TRIGGER IF NOT EXISTS runs_no_delete BEFORE DELETE ON runs
+BEGIN SELECT RAISE(ABORT, 'run history is append-only'); END;
+
+-- Totais acumulados por (prompt, modelo), atualizados a cada execução
+CREATE TABLE IF NOT EXISTS rollups (
+    prompt_version TEXT NOT NULL,
+    model TEXT NOT NULL,
+    runs INTEGER NOT NULL DEFAULT 0,
+    {", ".join(f"{c} REAL NOT NULL DEFAULT 0" for c in SUM_COLUMNS)},
+    PRIMARY KEY (prompt_version, model)
+);
+"""
+
+# Colunas lidas por run_metrics (também buscadas da execução anterior do grupo)
+METRIC_COLUMNS = (
+    "total",
+    "ok",
+    "retries",
+    "risk_alto",
+    "wall_seconds",
+    "busy_seconds",
+    "input_tokens",
+    "output_tokens",
+)
+
+# Variações que são sinalizadas como regressão no relatório de tendências
+VALIDITY_DROP = 0.05
+COST_INCREASE = 0.20
+THROUGHPUT_DROP = 0.20
+
+
+def connect(db_path: Path) -> sqlite3.Connection:
+    """
+    Abre (e cria, se necessário) o registro de execuções.
+    """
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(db_path))
+    conn.row_factory = sqlite3.Row
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def record_run(conn: sqlite3.Connection, summary: Dict[str, Any]) -> None:
+    """
+    Registra os agregados de uma execução e atualiza os totais acumulados
+    do grupo (prompt, modelo) na mesma transação.
+    """
+    columns = [
+        "run_id",
+        "created_at",
+        "prompt_version",
+        "backend",
+        "model",
+        "max_item_seconds",
+        *SUM_COLUMNS,
+    ]
+    values = [summary.get(c, 0) for c in columns]
+    increments = ", ".join(f"{c} = {c} + excluded.{c}" for c in SUM_COLUMNS)
+
+    with conn:
+        conn.execute(
+            f"INSERT INTO runs ({', '.join(columns)})"
+            f" VALUES ({', '.join('?' * len(columns))})",
+            values,
+        )
+        conn.execute(
+            f"INSERT INTO rollups (prompt_version, model, runs, {', '.join(SUM_COLUMNS)})"
+            f" VALUES (?, ?, 1, {', '.join('?' * len(SUM_COLUMNS))})"
+            f" ON CONFLICT (prompt_version, model) DO UPDATE SET"
+            f" runs = runs + 1, {increments}",
+            [
+                summary["prompt_version"],
+                summary["model"],
+                *(summary.get(c, 0) for c in SUM_COLUMNS),
+            ],
+        )
+
+
+def run_metrics(row) -> Dict[str, float]:
+    """
+    Indicadores derivados dos agregados de uma execução (ou de um rollup).
+    """
+    total = row["total"] or 0
+    wall = row["wall_seconds"] or 0
+    return {
+        "validity": row["ok"] / total if total else 0.0,
+        "tokens_per_item": (
+            (row["input_tokens"] + row["output_tokens"]) / total if total else 0.0
+        ),
+        "items_per_minute": total / wall * 60 if wall else 0.0,
+        "seconds_per_item": row["busy_seconds"] / total if total else 0.0,
+        "retries_per_item": row["retries"] / total if total else 0.0,
+        "high_risk": row["risk_alto"] / row["ok"] if row["ok"] else 0.0,
+    }
+
+
+def _regressions(current: Dict[str, float], reference: Dict[str, float]) -> List[str]:
+    flags = []
+    if reference["validity"] - current["validity"] > VALIDITY_DROP:
+        flags.append("validade")
+
+    ref_tokens = reference["tokens_per_item"]
+    if ref_tokens and current["tokens_per_item"] > ref_tokens * (1 + COST_INCREASE):
+        flags.append("custo")
+
+    ref_speed = reference["items_per_minute"]
+    if ref_speed and current["items_per_minute"] < ref_speed * (1 - THROUGHPUT_DROP):
+        flags.append("vazão")
+    return flags
+
+
+def trend_report(
+    conn: sqlite3.Connection,
+    last: int = 10,
+    prompt_version: Optional[str] = None,
+    model: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Tendência das últimas execuções, calculada apenas a partir dos agregados
+    armazenados: cada execução é comparada com a anterior do mesmo grupo
+    (prompt, modelo) e com a média acumulada do grupo.
+    """
+    clauses, params = [], []
+    if prompt_version:
+        clauses.append("prompt_version = ?")
+        params.append(prompt_version)
+    if model:
+        clauses.append("model = ?")
+        params.append(model)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+    # A execução anterior do mesmo grupo vem de uma window function, então
+    # mesmo a mais antiga exibida é comparada com a sua antecessora real.
+    # Os filtros são sobre as chaves da partição e não cortam nenhum grupo.
+    previous_columns = ", ".join(
+        f"LAG({c}) OVER w AS prev_{c}" for c in ("id", *METRIC_COLUMNS)
+    )
+    rows = conn.execute(
+        f"SELECT * FROM (SELECT *, {previous_columns} FROM runs {where}"
+        " WINDOW w AS (PARTITION BY prompt_version, model ORDER BY id))"
+        " ORDER BY id DESC LIMIT ?",
+        [*params, last],
+    ).fetchall()
+    rows.reverse()
+    baselines = {
+        (r["prompt_version"], r["model"]): run_metrics(r)
+        for r in conn.execute("SELECT * FROM rollups").fetchall()
+    }
+
+    report = []
+    for row in rows:
+        group = (row["prompt_version"], row["model"])
+        metrics = run_metrics(row)
+        prev = None
+        if row["prev_id"] is not None:
+            prev = run_metrics({c: row[f"prev_{c}"] for c in METRIC_COLUMNS})
+
+        flags = _regressions(metrics, prev) if prev else []
+        report.append(
+            {
+                "run_id": row["run_id"],
+                "created_at": row["created_at"],
+                "prompt_version": row["prompt_version"],
+                "model": row["model"],
+                "total": int(row["total"]),
+                **metrics,
+                "delta_validity": (
+                    metrics["validity"] - prev["validity"] if prev else None
+                ),
+                "baseline": baselines.get(group),
+                "regressions": flags,
+            }
+        )
+    return report
+
+
+def run_trends(args, db_path: Path) -> None:
+    """
+    Executa o subcomando "trends" e imprime a tabela de tendências.
+    """
+    if not db_path.exists():
+        print(f"Run history not found: {db_path}")
+        return
+
+    conn = connect(db_path)
+    try:
+        report = trend_report(conn, args.last, args.prompt, args.model)
+    finally:
+        conn.close()
+
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+        return
+
+    print(
+        f"{'data':<20} {'prompt':<6} {'modelo':<24} {'itens':>5} {'válidos':>8}"
+        f" {'Δ':>7} {'tok/item':>9} {'itens/min':>9} {'s/item':>7}"
+        f" {'corr/item':>9}  regressões"
+    )
+    for r in report:
+        delta = (
+            f"{r['delta_validity'] * 100:+.1f}"
+            if r["delta_validity"] is not None
+            else "-"
+        )
+        print(
+            f"{r['created_at'][:19]:<20} {r['prompt_version']:<6} {r['model'][:24]:<24}"
+            f" {r['total']:>5} {r['validity'] * 100:>7.1f}% {delta:>7}"
+            f" {r['tokens_per_item']:>9.0f} {r['items_per_minute']:>9.1f}"
+            f" {r['seconds_per_item']:>7.1f} {r['retries_per_item']:>9.2f}"
+            f"  {', '.join(r['regressions']) or '-'}"
+        )
+
+    groups = {(r["prompt_version"], r["model"]): r["baseline"] for r in report}
+    if groups:
+        print("\nMédias acumuladas por grupo:")
+    for (prompt, model_name), base in groups.items():
+        if base:
+            print(
+                f"  {prompt} / {model_name}: válidos {base['validity'] * 100:.1f}%"
+                f" | {base['tokens_per_item']:.0f} tok/item"
+                f" | {base['items_per_minute']:.1f} itens/min"
+            )
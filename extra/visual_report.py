@@ -1,19 +1,17 @@
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, List, Optional
 
 import matplotlib.pyplot as plt
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
 
+BG_COLOR = "#09090f"
 
-def generate_infographic(payload: Dict[str, Any], output_path: Path):
+
+def count_risk_levels(results: List[Dict[str, Any]]) -> Dict[str, int]:
     """
-    Gera um dashboard visual das análises clínicas:
-    - Gráfico de barras do grau de risco dos casos.
-    - Gráfico de setores com a taxa de sucesso da pipeline.
+    Conta os níveis de risco das análises válidas de uma lista de resultados.
     """
-    # 1. Preparação dos Dados
-    results = payload.get("results", [])
-
-    # Contagem de Riscos
     risk_counts = {"baixo": 0, "médio": 0, "alto": 0}
     for r in results:
         if r.get("ok") and r.get("output"):
@@ -21,17 +19,77 @@ def generate_infographic(payload: Dict[str, Any], output_path: Path):
             level = risk_obj.get("level", "").lower()
             if level in risk_counts:
                 risk_counts[level] += 1
+    return risk_counts
+
+
+def generate_infographic(
+    payload: Dict[str, Any],
+    output_path: Path,
+    risk_counts: Optional[Dict[str, int]] = None,
+):
+    """
+    Gera um dashboard visual das análises clínicas:
+    - Gráfico de barras do grau de risco dos casos.
+    - Gráfico de setores com a taxa de sucesso da pipeline.
+    Se a contagem de riscos já for conhecida (ex: agregados mantidos durante
+    a execução), ela é usada diretamente em vez de percorrer os resultados.
+    """
+    plt.style.use("dark_background")
+    fig = plt.figure(figsize=(14, 7), facecolor=BG_COLOR)
+    draw_infographic(fig, payload, risk_counts)
+
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    plt.savefig(output_path, dpi=100)
+    print(f"Infográfico gerado com sucesso: {output_path}")
+    plt.close(fig)
+
+
+def render_infographic_file(
+    payload: Dict[str, Any],
+    output_path: Path,
+    risk_counts: Optional[Dict[str, int]] = None,
+):
+    """
+    Mesmo dashboard de generate_infographic, mas sem o pyplot: usa uma Figure
+    própria com o canvas Agg, o que é seguro fora da thread principal (ex: no
+    dashboard ao vivo). Não imprime nada e grava o arquivo de forma atômica.
+    """
+    fig = Figure(figsize=(14, 7), facecolor=BG_COLOR)
+    FigureCanvasAgg(fig)
+    draw_infographic(fig, payload, risk_counts)
+
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = output_path.with_name(output_path.name + ".tmp")
+    fig.savefig(tmp_path, dpi=100, format="png")
+    tmp_path.replace(output_path)
+
+
+def draw_infographic(
+    fig: Figure,
+    payload: Dict[str, Any],
+    risk_counts: Optional[Dict[str, int]] = None,
+):
+    """
+    Desenha os gráficos do dashboard em uma figura já criada.
+    As cores do tema escuro são aplicadas explicitamente, sem depender do
+    estilo global do matplotlib.
+    """
+    # 1. Preparação dos Dados
+    if risk_counts is None:
+        risk_counts = count_risk_levels(payload.get("results", []))
 
     # Dados de Sucesso/Falha
     total_ok = payload.get("ok", 0)
     total_failed = payload.get("failed", 0)
 
     # 2. Configuração do Estilo
-    bg_color = "#09090f"
-    plt.style.use("dark_background")
-    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(14, 7), facecolor=bg_color)
-    ax1.set_facecolor(bg_color)
-    ax2.set_facecolor(bg_color)
+    bg_color = BG_COLOR
+    ax1, ax2 = fig.subplots(1, 2)
+    for ax in (ax1, ax2):
+        ax.set_facecolor(bg_color)
+        ax.tick_params(colors="white")
+        for spine in ax.spines.values():
+            spine.set_color("white")
 
     # Título Geral
     fig.suptitle(
@@ -47,9 +105,9 @@ def generate_infographic(payload: Dict[str, Any], output_path: Path):
     colors_bar = ["#55c276", "#d1cd64", "#d6384d"]
 
     bars = ax1.bar(levels, counts, color=colors_bar, edgecolor=bg_color, zorder=3)
-    ax1.set_title("Distribuição de Nível de Risco", fontsize=14, pad=15)
-    ax1.set_ylabel("Quantidade de Casos")
-    ax1.grid(axis="y", linestyle="--", alpha=0.3, zorder=0)
+    ax1.set_title("Distribuição de Nível de Risco", fontsize=14, pad=15, color="white")
+    ax1.set_ylabel("Quantidade de Casos", color="white")
+    ax1.grid(axis="y", linestyle="--", alpha=0.3, zorder=0, color="white")
 
     max_count = max(counts) if counts else 1
     ax1.set_ylim(0, max_count * 1.25)
@@ -100,13 +158,11 @@ def generate_infographic(payload: Dict[str, Any], output_path: Path):
         )
         legend.get_frame().set_facecolor(bg_color)
         legend.get_frame().set_edgecolor("white")
+        legend.get_title().set_color("white")
+        for text in legend.get_texts():
+            text.set_color("white")
 
-    ax2.set_title("Taxa de Sucesso do Pipeline", fontsize=14)
+    ax2.set_title("Taxa de Sucesso do Pipeline", fontsize=14, color="white")
 
     # 3. Finalização
-    plt.tight_layout(rect=[0, 0.03, 1, 0.95])
-
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-    plt.savefig(output_path, dpi=100)
-    print(f"Infográfico gerado com sucesso: {output_path}")
-    plt.close(fig)
+    fig.tight_layout(rect=[0, 0.03, 1, 0.95])
@@ -1,18 +1,37 @@
 from __future__ import annotations
 
 import argparse
+import functools
 import json
 import os
 import re
+import time
+import uuid
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Dict, List, Literal, Optional, Tuple, TypedDict
+from typing import Any, Dict, List, Literal, NamedTuple, Optional, Tuple, TypedDict
 
 from dotenv import load_dotenv
 from google import genai
-from google.genai import types
 
+from extra.cassette import Cassette, CassetteMissError
 from extra.interactive_mode import run_interactive_mode
-from extra.result_pdf import create_clinical_pdf
+from extra.live_dashboard import LiveDashboard, RunningStats
+from extra.llm_backends import GeminiBackend, LLMBackend, OpenAICompatibleBackend
+from extra.profiling import StageProfiler
+from extra.prompt_cache import PromptCache
+from extra.result_pdf import create_bulk_pdf, create_clinical_pdf
+from extra.results_store import (
+    add_query_arguments,
+    connect,
+    ingest_file,
+    ingest_payload,
+    run_query,
+)
+from extra.run_history import connect as connect_history
+from extra.run_history import record_run, run_trends
 from extra.visual_report import generate_infographic
 
 # Imports obrigatórios para o novo escopo
@@ -28,13 +47,29 @@ BASE_DIR = Path(__file__).parent
 INPUT_DIR = BASE_DIR / "data" / "input"
 PROMPTS_DIR = BASE_DIR / "prompts"
 OUT_PATH = BASE_DIR / "results.json"
+RESULTS_DB_PATH = BASE_DIR / "results.db"
+RUN_HISTORY_PATH = BASE_DIR / "run_history.db"
 API_KEY = os.getenv("GOOGLE_API_KEY")
 
-if not API_KEY:
-    raise ValueError("ERRO: GOOGLE_API_KEY não encontrada no .env")
+MODEL_NAME = "gemini-3-flash-preview"
+# Servidor local compatível com a API do OpenAI (--backend openai)
+LOCAL_LLM_BASE_URL = os.getenv("LOCAL_LLM_BASE_URL", "http://localhost:8000/v1")
+LOCAL_LLM_MODEL = os.getenv("LOCAL_LLM_MODEL")
+LOCAL_LLM_API_KEY = os.getenv("LOCAL_LLM_API_KEY")
 
-# Cliente genai para acessar a API do Google e utilizar o Gemini
-GENAI_CLIENT = genai.Client(api_key=API_KEY)
+# Cliente genai para acessar a API do Google e utilizar o Gemini.
+# A chave só é exigida quando o modelo é chamado de fato (o replay e os
+# subcomandos do banco de resultados funcionam offline).
+GENAI_CLIENT = genai.Client(api_key=API_KEY) if API_KEY else None
+
+# Cassete de gravação/reprodução das chamadas ao modelo (--record / --replay)
+CASSETTE: Optional[Cassette] = None
+
+# Backend usado por call_model, definido em main() a partir de --backend
+BACKEND: Optional[LLMBackend] = None
+
+# Perfil de CPU/memória por etapa da pipeline (--profile)
+PROFILER: Optional[StageProfiler] = None
 
 # =========================
 # 1. Pydantic Schemas (Structured Output)
@@ -93,12 +128,43 @@ class ClinicalState(TypedDict):
     # Conta o número de tentativas falhas de gerar uma análise válida
     retry_count: int
 
+    # Número de candidatos gerados em paralelo pelo nó de geração (--candidates)
+    candidates: int
+
 
 # =========================
 # 3. IO / Prompt Helpers
 # =========================
 
 
+def profile_stage(name: str):
+    """
+    Contexto que mede a etapa `name` quando o --profile está ativo.
+    """
+    return PROFILER.stage(name) if PROFILER is not None else nullcontext()
+
+
+def profile_worker(name: str):
+    """
+    Contexto que inclui uma thread auxiliar na etapa `name` do --profile.
+    """
+    return PROFILER.attach(name) if PROFILER is not None else nullcontext()
+
+
+def profiled(name: str, node):
+    """
+    Envolve um nó do grafo para que cada execução seja medida como a etapa `name`.
+    """
+
+    @functools.wraps(node)
+    def wrapper(state: ClinicalState) -> ClinicalState:
+        with profile_stage(name):
+            return node(state)
+
+    return wrapper
+
+
+@functools.lru_cache(maxsize=None)
 def load_prompt(prompt_version: str) -> str:
     path = PROMPTS_DIR / f"prompt_{prompt_version}.txt"
     if not path.exists():
@@ -107,6 +173,28 @@ def load_prompt(prompt_version: str) -> str:
     return path.read_text(encoding="utf-8")
 
 
+class PromptTemplate(NamedTuple):
+    """
+    Template dividido em torno do placeholder {INPUT}: o prefixo é estático
+    (persona, formato, regras) e pode ser cacheado no modelo.
+    """
+
+    prefix: str
+    suffix: str
+
+    def render(self, input_text: str) -> str:
+        return self.prefix + input_text + self.suffix
+
+
+@functools.lru_cache(maxsize=None)
+def compile_prompt(prompt_version: str) -> PromptTemplate:
+    """
+    Lê e divide o template uma única vez por processo e versão de prompt.
+    """
+    prefix, _, suffix = load_prompt(prompt_version).partition("{INPUT}")
+    return PromptTemplate(prefix, suffix)
+
+
 def read_inputs(input_dir: Path) -> List[Tuple[str, str]]:
     """
     Lê arquivos .txt. Retorna [(filename, content), ...]
@@ -133,47 +221,32 @@ def read_inputs(input_dir: Path) -> List[Tuple[str, str]]:
 # =========================
 
 
-def call_model(prompt_text: str) -> str:
+def call_model(
+    prompt_text: str, static_prefix: str = "", temperature: float = 0.5
+) -> str:
     """
-    Chama o modelo Gemini 3 Flash via API oficial.
+    Chama o modelo através do backend selecionado (Gemini por padrão).
+    O prompt enviado é static_prefix + prompt_text; o backend pode reaproveitar
+    o prefixo estático (ex: cache de contexto do Gemini).
+    Com um cassete ativo, a resposta é gravada (--record) ou servida
+    a partir do arquivo sem acessar o modelo (--replay).
     """
-    try:
-        response = GENAI_CLIENT.models.generate_content(
-            model="gemini-3-flash-preview",
-            contents=prompt_text,
-            config=types.GenerateContentConfig(
-                response_mime_type="application/json",
-                temperature=0.5,
-                # Passar o schema Pydantic direto aqui melhora a precisão
-                response_schema=ClinicalOutput,
-                # É necessário desativar algumas barreiras de segurança,
-                # pois os prompts podem conter temas sensíveis
-                safety_settings=[
-                    types.SafetySetting(
-                        category="HARM_CATEGORY_DANGEROUS_CONTENT",
-                        threshold="BLOCK_NONE",
-                    ),
-                    types.SafetySetting(
-                        category="HARM_CATEGORY_HARASSMENT", threshold="BLOCK_NONE"
-                    ),
-                    types.SafetySetting(
-                        category="HARM_CATEGORY_HATE_SPEECH", threshold="BLOCK_NONE"
-                    ),
-                    types.SafetySetting(
-                        category="HARM_CATEGORY_SEXUALLY_EXPLICIT",
-                        threshold="BLOCK_NONE",
-                    ),
-                    types.SafetySetting(
-                        category="HARM_CATEGORY_CIVIC_INTEGRITY", threshold="BLOCK_NONE"
-                    ),
-                ],
-            ),
-        )
+    full_prompt = static_prefix + prompt_text
+    params = {"model": BACKEND.model, "temperature": temperature}
+    if CASSETTE is not None and CASSETTE.mode == "replay":
+        return CASSETTE.replay(full_prompt, **params)
 
-        return response.text
+    try:
+        response_text = BACKEND.generate(prompt_text, static_prefix, temperature)
     except Exception as e:
-        # Repassa o erro para ser capturado no generation_node
-        raise RuntimeError(f"Error in the Google API: {str(e)}")
+        # Erros também entram no cassete, para que o replay siga o mesmo caminho
+        if CASSETTE is not None:
+            CASSETTE.record_error(full_prompt, str(e), **params)
+        raise
+
+    if CASSETTE is not None:
+        CASSETTE.record(full_prompt, response_text, **params)
+    return response_text
 
 
 # =========================
@@ -187,22 +260,130 @@ def generation_node(state: ClinicalState) -> ClinicalState:
     """
     print(f"--- Node: Generation ({state['filename']}) ---")
 
-    # Carrega o template do prompt baseado na versão do estado
-    prompt_template = load_prompt(state["prompt_version"])
-    # Injeta o texto de entrada no placeholder {INPUT} do prompt
-    full_prompt = prompt_template.replace("{INPUT}", state["input_text"])
+    # Template do prompt (carregado e dividido uma única vez por versão)
+    template = compile_prompt(state["prompt_version"])
+    # O texto de entrada ocupa o lugar do placeholder {INPUT}: o prefixo é
+    # estático e o restante do prompt é o que varia a cada chamada
+    variable_part = state["input_text"] + template.suffix
+
+    candidates = state.get("candidates", 1)
 
     try:
-        # Chama o modelo (API do Gemini)
-        response_str = call_model(full_prompt)
+        if candidates > 1:
+            # Gera vários candidatos em paralelo e fica com o primeiro válido
+            response_str = generate_candidates(
+                variable_part, template.prefix, candidates
+            )
+        else:
+            # Chama o modelo (API do Gemini)
+            response_str = call_model(variable_part, static_prefix=template.prefix)
         # Retorna a atualização do estado com a string JSON crua
         state["raw_response"] = response_str
         return state
+    except CassetteMissError:
+        raise
     except Exception as e:
         state["errors"] = [f"Error in generation node: {str(e)}"]
         return state
 
 
+def candidate_temperatures(k: int) -> List[float]:
+    """
+    Temperaturas dos candidatos: a primeira é a padrão e as demais
+    aumentam gradualmente para diversificar as respostas.
+    """
+    return [round(min(0.5 + 0.25 * i, 2.0), 2) for i in range(k)]
+
+
+def generate_candidates(prompt_text: str, static_prefix: str, k: int) -> str:
+    """
+    Geração especulativa: dispara k chamadas concorrentes com temperaturas
+    diferentes e devolve o primeiro candidato a chegar que passa na validação
+    do ClinicalOutput. Se nenhum passar, devolve o primeiro candidato que
+    respondeu, que segue para o fluxo de correção.
+    As chamadas já enviadas não são canceladas: as que ainda estiverem em
+    andamento terminam em segundo plano e são descartadas.
+    """
+    temperatures = candidate_temperatures(k)
+    full_prompt = static_prefix + prompt_text
+    choice_params = {"model": BACKEND.model, "candidates": k}
+
+    if CASSETTE is not None and CASSETTE.mode == "replay":
+        # A ordem de chegada não se repete no replay: usa o candidato que
+        # foi escolhido durante a gravação
+        index = int(CASSETTE.replay(full_prompt, **choice_params))
+        raw = call_model(prompt_text, static_prefix, temperatures[index])
+        if not passes_validation(raw):
+            print(f"   [!] None of the {k} candidates passed validation.")
+        return raw
+
+    try:
+        index, raw = race_candidates(prompt_text, static_prefix, temperatures)
+    except RuntimeError as e:
+        if CASSETTE is not None:
+            CASSETTE.record_error(full_prompt, str(e), **choice_params)
+        raise
+
+    if CASSETTE is not None:
+        CASSETTE.record(full_prompt, str(index), **choice_params)
+    return raw
+
+
+def race_candidates(
+    prompt_text: str, static_prefix: str, temperatures: List[float]
+) -> Tuple[int, str]:
+    """
+    Executa os candidatos em paralelo e avalia as respostas na ordem de
+    chegada. Devolve o índice e o texto do candidato escolhido.
+    """
+
+    def run_candidate(temperature: float) -> str:
+        # As threads dos candidatos são medidas junto com a etapa de geração
+        with profile_worker("generate"):
+            return call_model(prompt_text, static_prefix, temperature)
+
+    k = len(temperatures)
+    executor = ThreadPoolExecutor(max_workers=k, thread_name_prefix="candidate")
+    futures = {
+        executor.submit(run_candidate, temperature): i
+        for i, temperature in enumerate(temperatures)
+    }
+    fallback = None
+    failures = []
+
+    try:
+        for future in as_completed(futures):
+            try:
+                raw = future.result()
+            except Exception as e:
+                failures.append(str(e))
+                continue
+
+            if passes_validation(raw):
+                return futures[future], raw
+            if fallback is None:
+                fallback = (futures[future], raw)
+    finally:
+        # Não espera os candidatos restantes
+        executor.shutdown(wait=False)
+
+    if fallback is None:
+        raise RuntimeError(f"All {k} candidates failed: {'; '.join(failures)}")
+    print(f"   [!] None of the {k} candidates passed validation.")
+    return fallback
+
+
+def passes_validation(raw: Optional[str]) -> bool:
+    """
+    Indica se a resposta crua já é um ClinicalOutput válido.
+    """
+    try:
+        ClinicalOutput.model_validate_json(clean_json_string(raw or ""))
+        return True
+    except Exception:
+        return False
+
+
 def clean_json_string(raw_str: str) -> str:
     """
     Remove delimitadores de markdown se existirem.
@@ -296,6 +477,8 @@ def correction_node(state: ClinicalState) -> ClinicalState:
         state["raw_response"] = new_resp
         # Limpa os erros antigos para dar chance à nova validação
         state["errors"] = []
+    except CassetteMissError:
+        raise
     except Exception as e:
         state["errors"].append(f"Erro na correção: {str(e)}")
 
@@ -311,9 +494,9 @@ def build_graph() -> StateGraph:
     workflow = StateGraph(ClinicalState)
 
     # Adiciona nós
-    workflow.add_node("generator", generation_node)
-    workflow.add_node("validator", validation_node)
-    workflow.add_node("correction", correction_node)
+    workflow.add_node("generator", profiled("generate", generation_node))
+    workflow.add_node("validator", profiled("validate", validation_node))
+    workflow.add_node("correction", profiled("correct", correction_node))
 
     # Fluxo linear inicial
     workflow.set_entry_point("generator")
@@ -337,6 +520,14 @@ def save_results(payload: Dict[str, Any], path: Path) -> None:
     path.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
 
 
+def positive_int(value: str) -> int:
+    # Tipo do argparse para opções que precisam de um inteiro maior que zero
+    number = int(value)
+    if number <= 0:
+        raise argparse.ArgumentTypeError(f"deve ser maior que zero: {value}")
+    return number
+
+
 # =========================
 # 7. Main Execution
 # =========================
@@ -359,8 +550,163 @@ def main():
     parser.add_argument(
         "-i", "--interactive", action="store_true", help="Modo Chatbot Interativo"
     )
+    # Gravação/reprodução das respostas do modelo para rodar a pipeline offline
+    cassette_group = parser.add_mutually_exclusive_group()
+    cassette_group.add_argument(
+        "--record",
+        type=Path,
+        metavar="CASSETTE",
+        help="Grava todas as chamadas ao modelo no arquivo de cassete",
+    )
+    cassette_group.add_argument(
+        "--replay",
+        type=Path,
+        metavar="CASSETTE",
+        help="Serve as respostas do cassete sem chamar a API (falha se faltar)",
+    )
+    # Dashboard atualizado em segundo plano durante execuções longas
+    parser.add_argument(
+        "--live-dashboard",
+        type=Path,
+        metavar="PATH",
+        help="Atualiza um dashboard (.html, .svg ou .png) durante a execução",
+    )
+    parser.add_argument(
+        "--dashboard-interval",
+        type=float,
+        default=10.0,
+        metavar="SECONDS",
+        help="Intervalo entre atualizações do dashboard ao vivo (padrão: 10s)",
+    )
+    # Relatórios consolidados em vez de um PDF por arquivo
+    parser.add_argument(
+        "--bulk-pdf",
+        action="store_true",
+        help="Gera PDFs consolidados com sumário em vez de um PDF por arquivo",
+    )
+    parser.add_argument(
+        "--pdf-volume-size",
+        type=positive_int,
+        default=500,
+        metavar="N",
+        help="Máximo de relatórios por PDF consolidado (padrão: 500)",
+    )
+    # Geração especulativa com vários candidatos concorrentes
+    parser.add_argument(
+        "--candidates",
+        type=positive_int,
+        default=1,
+        metavar="K",
+        help="Gera K candidatos em paralelo e usa o primeiro válido (padrão: 1)",
+    )
+    # Backend do modelo: Gemini ou servidor local compatível com o OpenAI
+    parser.add_argument(
+        "--backend",
+        choices=["gemini", "openai"],
+        default="gemini",
+        help="Backend do modelo (padrão: gemini)",
+    )
+    parser.add_argument(
+        "--base-url",
+        default=LOCAL_LLM_BASE_URL,
+        help="URL do servidor compatível com o OpenAI (--backend openai)",
+    )
+    parser.add_argument(
+        "--model",
+        help="Nome do modelo (padrão: Gemini 3 Flash ou LOCAL_LLM_MODEL)",
+    )
+    # Perfil de CPU e memória por etapa
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        type=Path,
+        const=BASE_DIR / "profile",
+        metavar="DIR",
+        help="Mede CPU e memória de cada etapa e salva os perfis (padrão: profile/)",
+    )
+    # Cache de contexto do prefixo estático do prompt
+    parser.add_argument(
+        "--context-cache",
+        action="store_true",
+        help="Cacheia o prefixo estático do prompt no Gemini (envia só o relato)",
+    )
+    parser.add_argument(
+        "--cache-ttl",
+        type=positive_int,
+        default=3600,
+        metavar="SECONDS",
+        help="TTL do cache de contexto, renovado automaticamente (padrão: 3600s)",
+    )
+    # Subcomandos do banco de resultados indexado (results.db)
+    subparsers = parser.add_subparsers(dest="command")
+    query_parser = subparsers.add_parser(
+        "query", help="Consulta o banco de resultados (filtros e agregações)"
+    )
+    add_query_arguments(query_parser)
+    ingest_parser = subparsers.add_parser(
+        "ingest", help="Importa arquivos results.json para o banco de resultados"
+    )
+    ingest_parser.add_argument("files", nargs="+", type=Path)
+    # Tendências entre execuções a partir do registro de execuções
+    trends_parser = subparsers.add_parser(
+        "trends", help="Mostra a tendência de validade, custo e vazão entre execuções"
+    )
+    trends_parser.add_argument("--last", type=int, default=10)
+    trends_parser.add_argument("--prompt", help="Filtra pela versão do prompt")
+    trends_parser.add_argument("--model", help="Filtra pelo modelo")
+    trends_parser.add_argument(
+        "--json", action="store_true", help="Imprime o resultado em JSON"
+    )
     args = parser.parse_args()
 
+    if args.command == "query":
+        run_query(args, RESULTS_DB_PATH)
+        return
+    if args.command == "trends":
+        run_trends(args, RUN_HISTORY_PATH)
+        return
+    if args.command == "ingest":
+        conn = connect(RESULTS_DB_PATH)
+        try:
+            for json_path in args.files:
+                run_id = ingest_file(conn, json_path)
+                print(f"Ingested {json_path} (run {run_id})")
+        finally:
+            conn.close()
+        return
+
+    global CASSETTE, BACKEND, PROFILER
+    if args.replay:
+        CASSETTE = Cassette(args.replay, "replay")
+    elif args.backend == "gemini" and not API_KEY:
+        raise ValueError("ERRO: GOOGLE_API_KEY não encontrada no .env")
+    elif args.record:
+        CASSETTE = Cassette(args.record, "record")
+
+    if args.context_cache and args.backend == "openai":
+        print("[!] --context-cache only applies to the gemini backend; ignoring it")
+
+    if args.backend == "openai":
+        model = args.model or LOCAL_LLM_MODEL
+        if not model:
+            raise ValueError("ERRO: informe o modelo com --model ou LOCAL_LLM_MODEL")
+        BACKEND = OpenAICompatibleBackend(
+            args.base_url,
+            model,
+            ClinicalOutput,
+            api_key=LOCAL_LLM_API_KEY,
+            # Uma conexão por candidato da geração especulativa
+            max_connections=max(4, args.candidates),
+        )
+    else:
+        model = args.model or MODEL_NAME
+        prompt_cache = None
+        if args.context_cache and GENAI_CLIENT is None:
+            print("[!] --context-cache needs GOOGLE_API_KEY; running without it")
+        elif args.context_cache:
+            prompt_cache = PromptCache(GENAI_CLIENT, model, ttl_seconds=args.cache_ttl)
+        BACKEND = GeminiBackend(GENAI_CLIENT, model, ClinicalOutput, prompt_cache)
+
     # Escolha de versão do prompt
     prompt_version = "v2"
     if args.v1:
@@ -371,19 +717,50 @@ def main():
     # 2. Setup do Grafo
     app = build_graph()
 
-    print(f"Iniciando Pipeline (LangGraph + Pydantic) - Prompt {prompt_version}...\n")
+    print(f"Iniciando Pipeline (LangGraph + Pydantic) - Prompt {prompt_version}...")
+    print(f"Backend: {BACKEND.name} ({BACKEND.model})\n")
+
+    if args.profile:
+        PROFILER = StageProfiler(args.profile).start()
+
+    try:
+        run_pipeline(app, args, prompt_version)
+    finally:
+        BACKEND.close()
+        if PROFILER is not None:
+            PROFILER.finish()
+            print(PROFILER.report())
+            print(f"Profiles saved in {args.profile}")
+
 
+def run_pipeline(app, args, prompt_version: str) -> None:
+    """
+    Executa o modo interativo ou o processamento em batch dos arquivos de input.
+    """
     if args.interactive:
-        run_interactive_mode(app, prompt_version)
+        run_interactive_mode(app, prompt_version, candidates=args.candidates)
     else:
         # 3. Leitura dos arquivos de input
-        items = read_inputs(INPUT_DIR)
+        with profile_stage("read"):
+            items = read_inputs(INPUT_DIR)
         if not items:
             print("No files found in data/input. Terminating...")
             return
 
         results = []
         ok_count = 0
+        pdf_dir = BASE_DIR / "data" / "output"
+        # Análises válidas acumuladas para o PDF consolidado (--bulk-pdf)
+        bulk_entries = []
+
+        # Agregados atualizados a cada item, lidos pelo dashboard ao vivo
+        stats = RunningStats(total_expected=len(items))
+        live = None
+        if args.live_dashboard:
+            live = LiveDashboard(
+                stats, args.live_dashboard, args.dashboard_interval
+            ).start()
+            print(f"Live dashboard: {args.live_dashboard}")
 
         for fname, text in items:
             # Estado Inicial
@@ -395,8 +772,10 @@ def main():
                 "parsed_output": None,
                 "errors": [],
                 "retry_count": 0,
+                "candidates": args.candidates,
             }
 
+            started = time.perf_counter()
             try:
                 # Invoca o grafo
                 final_state = app.invoke(initial_state)
@@ -410,12 +789,17 @@ def main():
                     output_dict = output_data.model_dump()
 
                     # Geração de output em PDF para facilitar a leitura humana
-                    pdf_dir = BASE_DIR / "data" / "output"
-                    try:
-                        pdf_path = create_clinical_pdf(output_dict, fname, pdf_dir)
-                        print(f"Result PDF created: {pdf_path.name}")
-                    except Exception as e:
-                        print(f"Error creating result PDF: {e}")
+                    if args.bulk_pdf:
+                        bulk_entries.append((fname, output_dict))
+                    else:
+                        try:
+                            with profile_stage("pdf"):
+                                pdf_path = create_clinical_pdf(
+                                    output_dict, fname, pdf_dir
+                                )
+                            print(f"Result PDF created: {pdf_path.name}")
+                        except Exception as e:
+                            print(f"Error creating result PDF: {e}")
                 else:
                     output_dict = None
 
@@ -427,6 +811,16 @@ def main():
                         "output": output_dict,
                     }
                 )
+                stats.add(
+                    is_ok,
+                    risk_level=output_data.risk_assessment.level if is_ok else None,
+                    retries=final_state.get("retry_count", 0),
+                    elapsed=time.perf_counter() - started,
+                )
+            except CassetteMissError:
+                if live:
+                    live.stop()
+                raise
             except Exception as e:
                 results.append(
                     {
@@ -436,9 +830,26 @@ def main():
                         "output": None,
                     }
                 )
+                stats.add(False, elapsed=time.perf_counter() - started)
+
+        if live:
+            live.stop()
+
+        if bulk_entries:
+            try:
+                with profile_stage("pdf"):
+                    pdf_paths = create_bulk_pdf(
+                        bulk_entries, pdf_dir, volume_size=args.pdf_volume_size
+                    )
+                for pdf_path in pdf_paths:
+                    print(f"Consolidated PDF created: {pdf_path.name}")
+            except Exception as e:
+                print(f"Error creating consolidated PDF: {e}")
 
         # 4. Consolidação
         payload = {
+            "run_id": uuid.uuid4().hex,
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
             "prompt_version": prompt_version,
             "total": len(results),
             "ok": ok_count,
@@ -450,9 +861,63 @@ def main():
         print(f"Processamento concluído. Salvo em {OUT_PATH}")
         print(f"Sucesso: {ok_count} | Falhas: {len(results) - ok_count}")
 
+        # Indexa a execução no banco de resultados para consultas posteriores.
+        # Um replay só repete análises já gravadas e as duplicaria no banco
+        if CASSETTE is not None and CASSETTE.mode == "replay":
+            print("Replay run: not indexed in the results database")
+        else:
+            try:
+                conn = connect(RESULTS_DB_PATH)
+                try:
+                    ingest_payload(conn, payload)
+                finally:
+                    conn.close()
+                print(f"Results indexed in {RESULTS_DB_PATH}")
+            except Exception as e:
+                print(f"Error indexing results: {e}")
+
+        # Registra os agregados da execução no histórico (append-only).
+        # Execuções com --replay não chamam o modelo e as com --profile são
+        # mais lentas pela própria medição: ambas distorceriam as médias
+        snap = stats.snapshot()
+        if CASSETTE is not None and CASSETTE.mode == "replay":
+            print("Replay run: not recorded in the run history")
+        elif PROFILER is not None:
+            print("Profiled run: not recorded in the run history")
+        else:
+            try:
+                conn = connect_history(RUN_HISTORY_PATH)
+                try:
+                    record_run(
+                        conn,
+                        {
+                            "run_id": payload["run_id"],
+                            "created_at": payload["created_at"],
+                            "prompt_version": prompt_version,
+                            "backend": BACKEND.name,
+                            "model": BACKEND.model,
+                            "total": snap["total"],
+                            "ok": snap["ok"],
+                            "failed": snap["failed"],
+                            "retries": snap["retries"],
+                            "risk_baixo": snap["risk_counts"]["baixo"],
+                            "risk_medio": snap["risk_counts"]["médio"],
+                            "risk_alto": snap["risk_counts"]["alto"],
+                            "wall_seconds": snap["elapsed_seconds"],
+                            "busy_seconds": snap["busy_seconds"],
+                            "max_item_seconds": snap["max_item_seconds"],
+                            **BACKEND.usage(),
+                        },
+                    )
+                finally:
+                    conn.close()
+            except Exception as e:
+                print(f"Error recording run history: {e}")
+
         DASHBOARD_PATH = BASE_DIR / "results_dashboard.png"
         try:
-            generate_infographic(payload, DASHBOARD_PATH)
+            with profile_stage("dashboard"):
+                generate_infographic(payload, DASHBOARD_PATH, stats.risk_counts)
         except Exception as e:
             print(f"Error creating result dashboard: {e}")
 